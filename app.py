@@ -1,21 +1,104 @@
 import fitz  # PyMuPDF
+import numpy as np
 import pandas as pd
 import re
 import os
+import glob
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from importlib.util import find_spec
 
-# AI categorization imports
+from pdf_worker import extract_page_range_text
+
+# AI categorization dependencies are only imported when the model is loaded, so spawned
+# PDF workers (which re-import this module) and keyword-only runs don't pay for them
+HF_AVAILABLE = find_spec("transformers") is not None and find_spec("torch") is not None
+if not HF_AVAILABLE:
+    print("⚠️  Hugging Face transformers not installed. Install with: pip install transformers torch sentencepiece protobuf")
+
+# Optional ONNX Runtime backend for faster CPU inference
+ONNX_AVAILABLE = find_spec("optimum") is not None and find_spec("onnxruntime") is not None
+
+# Optional Aho-Corasick matcher for keyword categorization
 try:
-    from transformers import pipeline
-    HF_AVAILABLE = True
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
 except ImportError:
-    HF_AVAILABLE = False
-    print("⚠️  Hugging Face transformers not installed. Install with: pip install transformers torch")
+    AHOCORASICK_AVAILABLE = False
+
+# Calendar order used for sorting the Month column
+MONTH_ORDER = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Statements with at least this many pages are parsed in parallel
+PARALLEL_PAGE_THRESHOLD = 20
+MAX_PDF_WORKERS = 8
+PAGES_PER_TASK = 4
+
+# Per-month counts/totals kept next to the month files so runs don't re-read the whole log
+LOG_SUMMARY_FILE = "summary.parquet"
+
+# Migrated rows whose year/month couldn't be parsed
+UNKNOWN_LOG_FILE = "unknown.parquet"
+
+# Markers around the transaction section of a BMO statement
+TXN_SECTION_START = "Transactions since your last statement"
+TXN_SECTION_END = "Subtotal for"
+
+# One transaction in the (newline-joined) transaction section, compiled once at import.
+# [^\S\n] is whitespace that can't cross a line break.
+TXN_RE = re.compile(r'''
+    ^([A-Z][a-z]{2}\.\ \d{1,2})[^\S\n]+([A-Z][a-z]{2}\.\ \d{1,2})$\n   # Apr. 4 Apr. 7
+    ((?:.*\n)*?)                                                    # merchant lines
+    (.*?)(\d+\.\d{2})([^\S\n]+CR)?$                                  # [merchant] 12.34 [CR]
+''', re.MULTILINE | re.VERBOSE)
 
 # Global classifier variable to avoid reloading
 classifier = None
 
-def initialize_classifier():
+# Smaller MNLI model: comparable zero-shot accuracy to bart-large-mnli at a fraction of the size
+DEFAULT_MODEL = "MoritzLaurer/deberta-v3-base-mnli-fever-anli"
+
+# Where exported ONNX models are cached between runs
+ONNX_MODEL_DIR = "onnx_models"
+
+def configure_torch_for_cpu():
+    """Use every core for intra-op parallelism and enable oneDNN kernels"""
+    import torch
+    
+    torch.set_num_threads(os.cpu_count() or 4)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Can only be set once, before any inter-op work has started
+    torch.backends.mkldnn.enabled = True
+
+def load_onnx_model(model_name, quantize=False):
+    """Export the model to ONNX once (cached on disk) and load it with ONNX Runtime"""
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    
+    export_dir = os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+    
+    if not os.path.exists(os.path.join(export_dir, "model.onnx")):
+        print("🔧 Exporting model to ONNX (first run only)...")
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+    
+    if not quantize:
+        return ORTModelForSequenceClassification.from_pretrained(export_dir)
+    
+    # INT8 dynamic quantization, written next to the exported model
+    if not os.path.exists(os.path.join(export_dir, "model_quantized.onnx")):
+        print("🔧 Quantizing ONNX model to INT8 (first run only)...")
+        quantizer = ORTQuantizer.from_pretrained(export_dir)
+        qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=export_dir, quantization_config=qconfig)
+    
+    return ORTModelForSequenceClassification.from_pretrained(export_dir, file_name="model_quantized.onnx")
+
+def initialize_classifier(model_name=DEFAULT_MODEL, quantize=False, use_onnx=ONNX_AVAILABLE):
     """Initialize the Hugging Face classifier (one-time setup)"""
     global classifier
     
@@ -24,13 +107,42 @@ def initialize_classifier():
         return False
     
     if classifier is None:
-        print("🤖 Loading AI model for transaction categorization...")
-        print("📥 This may take a few minutes on first run (downloading ~500MB model)...")
+        print(f"🤖 Loading AI model ({model_name}) for transaction categorization...")
+        print("📥 This may take a few minutes on first run (downloading model)...")
         
         try:
-            # Use zero-shot classification model
-            classifier = pipeline("zero-shot-classification", 
-                                model="facebook/bart-large-mnli")
+            import torch
+            from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
+            
+            configure_torch_for_cpu()
+            
+            if use_onnx:
+                try:
+                    # ONNX Runtime with fused CPU kernels
+                    model = load_onnx_model(model_name, quantize)
+                    tokenizer = AutoTokenizer.from_pretrained(model_name)
+                    classifier = pipeline("zero-shot-classification",
+                                        model=model, tokenizer=tokenizer)
+                except Exception as e:
+                    # Export/provider problems shouldn't turn off AI categorization
+                    print(f"⚠️  ONNX Runtime failed ({e}), falling back to PyTorch...")
+                    use_onnx = False
+            
+            # PyTorch pipeline (default, or fallback when ONNX failed)
+            if not use_onnx:
+                if quantize:
+                    # INT8 dynamic quantization of the Linear layers for faster CPU inference
+                    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                    tokenizer = AutoTokenizer.from_pretrained(model_name)
+                    classifier = pipeline("zero-shot-classification",
+                                        model=model, tokenizer=tokenizer, device=-1)
+                else:
+                    # Use zero-shot classification model
+                    classifier = pipeline("zero-shot-classification", 
+                                        model=model_name, device=-1)
+                classifier.model.eval()
+            
             print("✅ AI model loaded successfully!")
             return True
         except Exception as e:
@@ -39,207 +151,287 @@ def initialize_classifier():
     
     return True
 
-def categorize_transaction(description):
-    """Categorize a transaction using hybrid approach: keywords first, then AI"""
-    
-    # First, try rule-based categorization for obvious cases
-    rule_based_category = fallback_categorization(description)
-    
-    # If rule-based found a specific category (not Miscellaneous), use it
-    if rule_based_category != "Miscellaneous":
-        return rule_based_category
-    
-    # Otherwise, use AI for ambiguous cases
+# Define categories for AI classification (using clean names directly)
+CANDIDATE_LABELS = [
+    "Food & Dining",
+    "Transportation", 
+    "Shopping",
+    "Entertainment",
+    "Subscriptions",
+    "Healthcare",
+    "ATM/Cash",
+    "Transfer",
+    "Groceries"
+]
+
+# Minimum AI confidence required to accept a prediction
+CONFIDENCE_THRESHOLD = 0.7  # Adjust this value (0.0 to 1.0)
+
+# Number of descriptions sent through the model per forward pass
+AI_BATCH_SIZE = 16
+
+def classify_with_ai(descriptions):
+    """Classify a list of descriptions with the AI model in batches"""
     global classifier
     
-    if classifier is None:
-        return "Miscellaneous"
-    
-    # Define categories for classification (using clean names directly)
-    candidate_labels = [
-        "Food & Dining",
-        "Transportation", 
-        "Shopping",
-        "Entertainment",
-        "Subscriptions",
-        "Healthcare",
-        "ATM/Cash",
-        "Transfer",
-        "Groceries"
-    ]
+    if classifier is None or len(descriptions) == 0:
+        return ["Miscellaneous"] * len(descriptions)
     
     try:
-        result = classifier(description, candidate_labels)
-        
+        results = classifier(list(descriptions), CANDIDATE_LABELS,
+                             batch_size=AI_BATCH_SIZE, multi_label=False)
+    except Exception as e:
+        print(f"⚠️  Error categorizing {len(descriptions)} transactions: {e}")
+        return ["Miscellaneous"] * len(descriptions)
+    
+    # A single sequence comes back as a dict rather than a list
+    if isinstance(results, dict):
+        results = [results]
+    
+    categories = []
+    for description, result in zip(descriptions, results):
         # Get the top prediction and its confidence score
         top_category = result['labels'][0]
         top_confidence = result['scores'][0]
         
-        # Only return the category if confidence is high enough
+        # Only keep the category if confidence is high enough
         # Otherwise return Miscellaneous
-        confidence_threshold = 0.7  # Adjust this value (0.0 to 1.0)
-        
-        if top_confidence >= confidence_threshold:
-            return top_category
+        if top_confidence >= CONFIDENCE_THRESHOLD:
+            categories.append(top_category)
         else:
             print(f"⚠️  Low confidence ({top_confidence:.2f}) for '{description}' → Miscellaneous")
-            return "Miscellaneous"
-        
-    except Exception as e:
-        print(f"⚠️  Error categorizing '{description}': {e}")
-        return "Miscellaneous"
+            categories.append("Miscellaneous")
+    
+    return categories
+
+# Keywords for rule-based categorization, checked in priority order
+CATEGORY_KEYWORDS = {
+    'Food & Dining': [
+        # Fast food chains
+        'mcdonald', 'tim horton', 'burger king', 'kfc', 'subway', 'pizza',
+        'starbucks', 'coffee', 'restaurant', 'cafe', 'diner', 'wendy',
+        'taco bell', 'popeyes', 'a&w', 'dairy queen', 'harveys',
+        # Food keywords
+        'resto', 'bistro', 'grill', 'kitchen', 'bar & grill',
+        # Your specific transactions
+        'golden fish', 'arby', 'nuri village', 'yogurt', 'poke'
+    ],
+    'Transportation': [
+        'uber', 'lyft', 'taxi', 'gas', 'petro', 'shell', 'esso', 'parking',
+        'transit', 'go train', 'ttc', 'presto', 'via rail'
+    ],
+    'Shopping': [
+        'amazon', 'walmart', 'target', 'costco', 'canadian tire', 'home depot',
+        'loblaws', 'shoppers', 'best buy', 'future shop'
+    ],
+    'Entertainment': [
+        'netflix', 'spotify', 'movie', 'cinema', 'theatre', 'concert',
+        'waterloo star'  # seems like entertainment venue
+    ],
+    'Subscriptions': [
+        'spotify', 'netflix', 'apple music', 'subscription', 'monthly fee',
+        'gym membership', 'planet fitness'
+    ],
+    'Transfer': [
+        'trsf', 'transfer', 'e-transfer', 'interac', 'payment to'
+    ],
+    'ATM/Cash': [
+        'atm', 'cash withdrawal', 'bank machine'
+    ],
+    'Healthcare': [
+        'pharmacy', 'shoppers drug', 'medical', 'doctor', 'hospital',
+        'dental', 'clinic', 'health'
+    ],
+    'Groceries': [
+        'loblaws', 'metro', 'sobeys', 'food basics', 'no frills',
+        'supermarket', 'grocery', 'fresh'
+    ],
+    'Miscellaneous': [
+        'hi yogurt'  # unclear what this is
+    ]
+}
+
+# Precompile one case-insensitive pattern per category (built once at import)
+CATEGORY_PATTERNS = {
+    category: re.compile('|'.join(map(re.escape, keywords)), re.IGNORECASE)
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+
+# One automaton over every keyword, mapping keyword -> (priority, category)
+if AHOCORASICK_AVAILABLE:
+    KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for priority, (category, keywords) in enumerate(CATEGORY_KEYWORDS.items()):
+        for keyword in keywords:
+            # Keywords listed under several categories belong to the first one
+            if keyword not in KEYWORD_AUTOMATON:
+                KEYWORD_AUTOMATON.add_word(keyword, (priority, category))
+    KEYWORD_AUTOMATON.make_automaton()
 
 def fallback_categorization(description):
     """Enhanced rule-based categorization for obvious cases"""
-    desc_lower = description.lower()
-    
-    categories = {
-        'Food & Dining': [
-            # Fast food chains
-            'mcdonald', 'tim horton', 'burger king', 'kfc', 'subway', 'pizza',
-            'starbucks', 'coffee', 'restaurant', 'cafe', 'diner', 'wendy',
-            'taco bell', 'popeyes', 'a&w', 'dairy queen', 'harveys',
-            # Food keywords
-            'resto', 'bistro', 'grill', 'kitchen', 'bar & grill',
-            # Your specific transactions
-            'golden fish', 'arby', 'nuri village', 'yogurt', 'poke'
-        ],
-        'Transportation': [
-            'uber', 'lyft', 'taxi', 'gas', 'petro', 'shell', 'esso', 'parking',
-            'transit', 'go train', 'ttc', 'presto', 'via rail'
-        ],
-        'Shopping': [
-            'amazon', 'walmart', 'target', 'costco', 'canadian tire', 'home depot',
-            'loblaws', 'shoppers', 'best buy', 'future shop'
-        ],
-        'Entertainment': [
-            'netflix', 'spotify', 'movie', 'cinema', 'theatre', 'concert',
-            'waterloo star'  # seems like entertainment venue
-        ],
-        'Subscriptions': [
-            'spotify', 'netflix', 'apple music', 'subscription', 'monthly fee',
-            'gym membership', 'planet fitness'
-        ],
-        'Transfer': [
-            'trsf', 'transfer', 'e-transfer', 'interac', 'payment to'
-        ],
-        'ATM/Cash': [
-            'atm', 'cash withdrawal', 'bank machine'
-        ],
-        'Healthcare': [
-            'pharmacy', 'shoppers drug', 'medical', 'doctor', 'hospital',
-            'dental', 'clinic', 'health'
-        ],
-        'Groceries': [
-            'loblaws', 'metro', 'sobeys', 'food basics', 'no frills',
-            'supermarket', 'grocery', 'fresh'
-        ],
-        'Miscellaneous': [
-            'hi yogurt'  # unclear what this is
-        ]
-    }
-    
-    # Check each category
-    for category, keywords in categories.items():
-        if any(keyword in desc_lower for keyword in keywords):
+    if AHOCORASICK_AVAILABLE:
+        # Single pass over the description; earliest category in priority order wins
+        best = None
+        for _, match in KEYWORD_AUTOMATON.iter(description.lower()):
+            if best is None or match < best:
+                best = match
+        return best[1] if best else 'Miscellaneous'
+    
+    # Check each category in priority order
+    for category, pattern in CATEGORY_PATTERNS.items():
+        if pattern.search(description):
             return category
     
     return 'Miscellaneous'
 
+def fallback_categorization_series(descriptions):
+    """Vectorized rule-based categorization over a whole Series of descriptions"""
+    if AHOCORASICK_AVAILABLE:
+        # One automaton pass per description is faster than one str.contains scan per category
+        return descriptions.fillna('').map(fallback_categorization)
+    
+    categories = pd.Series('Miscellaneous', index=descriptions.index, dtype=object)
+    
+    # Fill categories in priority order, only touching rows that are still unmatched
+    for category, pattern in CATEGORY_PATTERNS.items():
+        # The compiled pattern already carries re.IGNORECASE
+        mask = (categories == 'Miscellaneous') & descriptions.str.contains(pattern, na=False)
+        categories[mask] = category
+    
+    return categories
+
 def add_categories_to_dataframe(df):
     """Add category column to the dataframe"""
     if len(df) == 0:
         return df
     
-    # Initialize AI if available
-    ai_available = initialize_classifier()
-    
     print(f"🏷️  Categorizing {len(df)} transactions...")
     
-    # Add categories to the dataframe
-    if ai_available:
-        print("🤖 Using hybrid categorization (keywords + AI)...")
-        df['Category'] = df['Description'].apply(categorize_transaction)
+    # Rule-based categorization for obvious cases
+    df['Category'] = fallback_categorization_series(df['Description'])
+    misc_idx = df.index[df['Category'] == "Miscellaneous"]
+    
+    # Only load the AI model if some transactions are still ambiguous
+    if len(misc_idx) == 0:
+        print("📝 All transactions matched by keywords, skipping AI...")
+    elif initialize_classifier():
+        # Repeated merchants only need to go through the model once
+        misc_descriptions = df.loc[misc_idx, 'Description']
+        unique_descriptions = misc_descriptions.unique().tolist()
+        print(f"🤖 Using AI for {len(misc_idx)} ambiguous transactions ({len(unique_descriptions)} unique)...")
+        ai_categories = dict(zip(unique_descriptions, classify_with_ai(unique_descriptions)))
+        df.loc[misc_idx, 'Category'] = misc_descriptions.map(ai_categories)
     else:
         print("📝 Using rule-based categorization...")
-        df['Category'] = df['Description'].apply(fallback_categorization)
+    
+    # Low-cardinality column, store as categorical codes
+    df['Category'] = df['Category'].astype('category')
     
     return df
 
+def iter_pdf_text(pdf_path):
+    """Yield the text of a PDF in page order, splitting large documents across processes"""
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+        
+        # Small statements are faster to read serially than to spin up workers
+        if page_count < PARALLEL_PAGE_THRESHOLD:
+            for page in doc:
+                yield page.get_text()
+            return
+    
+    # PyMuPDF isn't thread-safe, so each worker process reopens the document
+    workers = min(os.cpu_count() or 1, MAX_PDF_WORKERS)
+    page_ranges = [(pdf_path, start, min(start + PAGES_PER_TASK, page_count))
+                   for start in range(0, page_count, PAGES_PER_TASK)]
+    
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield from executor.map(extract_page_range_text, page_ranges)
+    finally:
+        # Drop any pages not rendered yet if the caller stopped early
+        executor.shutdown(cancel_futures=True)
+
+def extract_statement_text(pdf_path):
+    """Extract PDF text only up to the end of the transaction section"""
+    texts = []
+    found_start = False
+    # Carry the end of the previous page so markers split across pages are still found
+    overlap = max(len(TXN_SECTION_START), len(TXN_SECTION_END)) - 1
+    tail = ""
+    
+    pages = iter_pdf_text(pdf_path)
+    try:
+        for text in pages:
+            texts.append(text)
+            window = tail + text
+            
+            if not found_start and TXN_SECTION_START in window:
+                found_start = True
+                window = window.split(TXN_SECTION_START, 1)[1]
+            
+            # Stop rendering pages once the transaction section has ended
+            if found_start and TXN_SECTION_END in window:
+                break
+            
+            tail = window[-overlap:]
+    finally:
+        # Close the PDF (and any workers) right away rather than at garbage collection
+        pages.close()
+    
+    return "".join(texts)
+
+def parse_transactions(txn_section):
+    """Parse the transaction section into parallel column lists"""
+    lines = txn_section.split('\n')
+    text = '\n'.join(line.strip() for line in lines if line.strip())
+    del lines
+    
+    # Single regex pass: a date line, then merchant lines up to the first line ending in an amount
+    trans_dates, post_dates, descriptions, amounts = [], [], [], []
+    for match in TXN_RE.finditer(text):
+        trans_date, post_date, merchant_text, line_before_amount, amount, credit = match.groups()
+        
+        # Amounts are kept as integer cents so sums are exact
+        amount = int(amount.replace('.', ''))
+        if credit:  # CR means credit (negative)
+            amount = -amount
+        
+        # Build the description
+        merchant_lines = merchant_text.split('\n')[:-1]  # each merchant line ends in a newline
+        if line_before_amount.strip():
+            merchant_lines.append(line_before_amount.strip())
+        description = " ".join(merchant_lines)
+        
+        trans_dates.append(trans_date)
+        post_dates.append(post_date)
+        descriptions.append(description)
+        amounts.append(amount)
+    
+    return {
+        "Transaction Date": trans_dates,
+        "Posted Date": post_dates,
+        "Description": descriptions,
+        "Amount": np.asarray(amounts, dtype=np.int64),  # cents
+    }
+
 def extract_bmo_transactions(pdf_path):
-    doc = fitz.open(pdf_path)
-    full_text = ""
-    for page in doc:
-        full_text += page.get_text()
+    full_text = extract_statement_text(pdf_path)
     
     # Focus on the transaction section
-    if "Transactions since your last statement" not in full_text:
+    if TXN_SECTION_START not in full_text:
         raise ValueError("Could not find transaction section")
         
-    txn_section = full_text.split("Transactions since your last statement", 1)[1]
+    txn_section = full_text.split(TXN_SECTION_START, 1)[1]
+    del full_text  # Don't hold the whole statement text alongside the section
     
     # Split by the subtotal to get just the transaction lines
-    if "Subtotal for" in txn_section:
-        txn_section = txn_section.split("Subtotal for", 1)[0]
-    
-    lines = txn_section.split('\n')
-    lines = [line.strip() for line in lines if line.strip()]
-    
-    transactions = []
-    i = 0
-    
-    while i < len(lines):
-        line = lines[i]
-        
-        # Skip header lines and card info
-        if (not line or "TRANS" in line or "DATE" in line or "DESCRIPTION" in line or 
-            "AMOUNT" in line or "Card number:" in line or "ETHAN QY WANG" in line):
-            i += 1
-            continue
-            
-        # Look for lines that start with date pattern (Apr. 4 Apr. 7)
-        date_match = re.match(r'^([A-Z][a-z]{2}\. \d{1,2})\s+([A-Z][a-z]{2}\. \d{1,2})$', line)
-        if date_match:
-            trans_date = date_match.group(1)  # Apr. 4
-            post_date = date_match.group(2)   # Apr. 7
-            
-            # Next lines contain the merchant info and amount
-            i += 1
-            merchant_lines = []
-            amount = None
-            
-            # Collect lines until we find the amount
-            while i < len(lines):
-                current_line = lines[i].strip()
-                if not current_line:
-                    i += 1
-                    continue
-                
-                # Check if this line has an amount at the end
-                amount_match = re.search(r'(\d+\.\d{2})(\s+CR)?$', current_line)
-                if amount_match:
-                    amount = float(amount_match.group(1))
-                    if amount_match.group(2):  # CR means credit (negative)
-                        amount = -amount
-                    
-                    # Add the part before the amount to merchant info
-                    line_before_amount = current_line[:current_line.rfind(amount_match.group(0))].strip()
-                    if line_before_amount:
-                        merchant_lines.append(line_before_amount)
-                    break
-                else:
-                    merchant_lines.append(current_line)
-                    
-                i += 1
-            
-            # Build the description
-            if amount is not None:
-                description = " ".join(merchant_lines)
-                transactions.append([trans_date, post_date, description, amount])
-        
-        i += 1
+    if TXN_SECTION_END in txn_section:
+        txn_section = txn_section.split(TXN_SECTION_END, 1)[0]
     
-    df = pd.DataFrame(transactions, columns=["Transaction Date", "Posted Date", "Description", "Amount"])
+    columns = parse_transactions(txn_section)
+    del txn_section
+    df = pd.DataFrame(columns)
     
     # Add categories to the dataframe
     df = add_categories_to_dataframe(df)
@@ -263,8 +455,105 @@ def get_month_year_from_transactions(df):
     
     return None, None
 
-def append_to_log(new_df, log_file="bmo_transactions_log.xlsx"):
-    """Append new transactions to existing log file, grouped by month"""
+def cents_to_dollars(cents):
+    """Convert integer cent amounts to dollars for display/export"""
+    return cents / 100
+
+def month_log_path(log_dir, year, month):
+    """Path of the Parquet file holding one month of the log"""
+    return os.path.join(log_dir, f"{year}-{month}.parquet")
+
+def month_log_files(log_dir):
+    """Paths of every monthly Parquet file in the log"""
+    return sorted(glob.glob(os.path.join(log_dir, "[0-9]*-*.parquet")))
+
+def summarize_months(df):
+    """Transaction count and total amount (cents) per month"""
+    # size (not count) so rows with a missing Amount are still counted
+    summary = df.groupby(["Year", "Month"], observed=True)["Amount"].agg(["size", "sum"]).reset_index()
+    summary.columns = ["Year", "Month", "Transaction Count", "Total Amount"]
+    return summary
+
+def read_log_summary(log_dir):
+    """Read the per-month summary, rebuilding it from the month files if it's missing"""
+    summary_path = os.path.join(log_dir, LOG_SUMMARY_FILE)
+    if os.path.exists(summary_path):
+        return pd.read_parquet(summary_path)
+    
+    month_files = month_log_files(log_dir)
+    if not month_files:
+        return None
+    return pd.concat([summarize_months(pd.read_parquet(path, columns=["Year", "Month", "Amount"]))
+                      for path in month_files], ignore_index=True)
+
+def read_unknown_rows(log_dir):
+    """Rows kept from the old log whose year/month couldn't be parsed (None if there are none)"""
+    unknown_path = os.path.join(log_dir, UNKNOWN_LOG_FILE)
+    if not os.path.exists(unknown_path):
+        return None
+    return pd.read_parquet(unknown_path)
+
+def update_log_summary(month_df, log_dir, year, month):
+    """Replace one month's row in the small summary file instead of re-reading the whole log"""
+    month_summary = summarize_months(month_df)
+    summary = read_log_summary(log_dir)
+    if summary is None:
+        summary = month_summary
+    else:
+        summary = summary[~((summary["Year"] == year) & (summary["Month"] == month))]
+        summary = pd.concat([summary, month_summary], ignore_index=True)
+    
+    summary["Year"] = summary["Year"].astype("int16")
+    summary["Month"] = pd.Categorical(summary["Month"], categories=MONTH_ORDER, ordered=True)
+    summary = summary.sort_values(["Year", "Month"], kind="mergesort")
+    summary.to_parquet(os.path.join(log_dir, LOG_SUMMARY_FILE), engine="pyarrow", index=False)
+
+def write_month_log(month_df, log_dir, year, month):
+    """Write one month of transactions (Year int16, ordered Month categorical) to its own Parquet file"""
+    month_df.to_parquet(month_log_path(log_dir, year, month), engine="pyarrow",
+                        compression="snappy", index=False)
+    update_log_summary(month_df, log_dir, year, month)
+
+def migrate_excel_log(excel_file, log_dir):
+    """One-time conversion of the old Excel log into the per-month Parquet log"""
+    print(f"📦 Migrating {excel_file} to Parquet log in {log_dir}/...")
+    
+    # calamine is much faster than openpyxl but needs pandas 2.2+ and python-calamine
+    excel_dtypes = {"Description": str, "Amount": "float64"}
+    try:
+        existing_df = pd.read_excel(excel_file, engine="calamine", dtype=excel_dtypes)
+    except (ImportError, ValueError):
+        existing_df = pd.read_excel(excel_file, dtype=excel_dtypes)
+    
+    # The Excel log stores dollars, the Parquet log stores cents (nullable, blank amounts stay missing)
+    existing_df = existing_df.assign(Amount=(existing_df["Amount"] * 100).round().astype("Int64"))
+    missing_amount = existing_df["Amount"].isna().sum()
+    if missing_amount:
+        print(f"⚠️  {missing_amount} rows have no amount; kept with a missing Amount")
+    
+    years = pd.to_numeric(existing_df["Year"], errors="coerce")
+    valid_month = existing_df["Month"].isin(MONTH_ORDER)
+    months = pd.Series(pd.Categorical(existing_df["Month"].where(valid_month), categories=MONTH_ORDER, ordered=True),
+                       index=existing_df.index)
+    unknown_month = years.isna() | ~valid_month
+    
+    os.makedirs(log_dir, exist_ok=True)
+    
+    # Rows without a usable year/month can't go in a month file; keep them as-is in a side file
+    if unknown_month.any():
+        unknown_df = existing_df[unknown_month]
+        unknown_df = unknown_df.assign(Year=unknown_df["Year"].astype("string"),
+                                       Month=unknown_df["Month"].astype("string"))
+        unknown_df.to_parquet(os.path.join(log_dir, UNKNOWN_LOG_FILE), engine="pyarrow", index=False)
+        print(f"⚠️  {unknown_month.sum()} rows have no valid year/month; kept in {log_dir}/{UNKNOWN_LOG_FILE}")
+    
+    placed_df = existing_df[~unknown_month].assign(Year=years[~unknown_month].astype("int16"),
+                                                   Month=months[~unknown_month])
+    for (year, month), month_df in placed_df.groupby(["Year", "Month"], observed=True):
+        write_month_log(month_df, log_dir, int(year), month)
+
+def append_to_log(new_df, log_dir="bmo_transactions_log"):
+    """Write new transactions to the Parquet log (one file per month) and return the per-month summary"""
     
     if len(new_df) == 0:
         print("No new transactions to add")
@@ -272,52 +561,44 @@ def append_to_log(new_df, log_file="bmo_transactions_log.xlsx"):
     
     year, month = get_month_year_from_transactions(new_df)
     
-    # Check if log file exists
-    if os.path.exists(log_file):
-        # Read existing data
-        existing_df = pd.read_excel(log_file)
-        
-        # Check if this month already exists
-        if not existing_df.empty and "Year" in existing_df.columns and "Month" in existing_df.columns:
-            # Remove existing entries for this month (in case of reprocessing)
-            existing_df = existing_df[~((existing_df["Year"] == year) & (existing_df["Month"] == month))]
-    else:
-        existing_df = pd.DataFrame()
+    # An unrecognised month would become NaN in the categorical and vanish from the summary
+    if month not in MONTH_ORDER:
+        raise ValueError(f"Unrecognised month '{month}' in transaction dates (expected one of {', '.join(MONTH_ORDER)})")
     
-    # Add year and month columns to new transactions
-    new_df_with_month = new_df.copy()
-    new_df_with_month.insert(0, "Year", year)
-    new_df_with_month.insert(1, "Month", month)
+    # Add year and month columns in front of the new transactions (single allocation)
+    month_columns = pd.DataFrame({
+        "Year": pd.Series(year, index=new_df.index, dtype="int16"),
+        "Month": pd.Categorical([month] * len(new_df), categories=MONTH_ORDER, ordered=True),
+    }, index=new_df.index)
+    new_df_with_month = pd.concat([month_columns, new_df], axis=1)
     
-    # Combine old and new data
-    if not existing_df.empty:
-        combined_df = pd.concat([existing_df, new_df_with_month], ignore_index=True)
-    else:
-        combined_df = new_df_with_month
-    
-    # Sort by year and month
-    month_order = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                   'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    # Each month lives in its own file, so reprocessing a month just overwrites it
+    os.makedirs(log_dir, exist_ok=True)
+    write_month_log(new_df_with_month, log_dir, year, month)
     
-    def sort_key(row):
-        try:
-            year_val = int(row["Year"])
-            month_idx = month_order.index(row["Month"]) if row["Month"] in month_order else 99
-            return (year_val, month_idx)
-        except:
-            return (9999, 99)  # Put unknown formats at the end
+    return read_log_summary(log_dir), year, month
+
+def export_log_to_excel(log_dir, excel_file):
+    """Export the whole Parquet log to a single Excel workbook (amounts in dollars)"""
+    combined_df = pd.concat([pd.read_parquet(path) for path in month_log_files(log_dir)], ignore_index=True)
     
-    combined_df['sort_key'] = combined_df.apply(sort_key, axis=1)
-    combined_df = combined_df.sort_values('sort_key').drop('sort_key', axis=1)
+    # Sort by year and month
+    combined_df["Month"] = pd.Categorical(combined_df["Month"], categories=MONTH_ORDER, ordered=True)
+    combined_df["Year"] = combined_df["Year"].astype("int16")
+    combined_df = combined_df.sort_values(["Year", "Month"], kind="mergesort")
     
-    # Save to file
-    combined_df.to_excel(log_file, index=False)
+    # Rows with an unknown year/month go at the end
+    unknown_df = read_unknown_rows(log_dir)
+    if unknown_df is not None:
+        combined_df = pd.concat([combined_df.astype({"Year": object, "Month": object}),
+                                 unknown_df.astype({"Year": object, "Month": object})], ignore_index=True)
     
-    return combined_df, year, month
+    combined_df.assign(Amount=cents_to_dollars(combined_df["Amount"])).to_excel(excel_file, index=False)
 
-def main():
+def main(export_excel=False):
     pdf_file = "May 5, 2025.pdf"
-    log_file = "bmo_transactions_log.xlsx"
+    log_dir = "bmo_transactions_log"
+    excel_file = "bmo_transactions_log.xlsx"
     
     # Extract transactions from PDF
     df = extract_bmo_transactions(pdf_file)
@@ -326,47 +607,57 @@ def main():
     if len(df) == 0:
         print("❌ No transactions found. Let me debug...")
         # Debug output
-        doc = fitz.open(pdf_file)
-        full_text = ""
-        for page in doc:
-            full_text += page.get_text()
+        full_text = extract_statement_text(pdf_file)
         
-        txn_section = full_text.split("Transactions since your last statement", 1)[1]
-        if "Subtotal for" in txn_section:
-            txn_section = txn_section.split("Subtotal for", 1)[0]
+        txn_section = full_text.split(TXN_SECTION_START, 1)[1]
+        if TXN_SECTION_END in txn_section:
+            txn_section = txn_section.split(TXN_SECTION_END, 1)[0]
         
         lines = txn_section.split('\n')
         print("Raw lines from transaction section:")
         for i, line in enumerate(lines[:20]):  # Show first 20 lines
             print(f"{i}: '{line.strip()}'")
     else:
+        # Carry over an existing Excel log the first time the Parquet log is used
+        if not os.path.isdir(log_dir) and os.path.exists(excel_file):
+            migrate_excel_log(excel_file, log_dir)
+        
         # Append to log
-        combined_df, year, month = append_to_log(df, log_file)
+        monthly_summary, year, month = append_to_log(df, log_dir)
         
         print(f"✅ Extracted {len(df)} transactions for {month} {year}")
-        print(f"✅ Updated log file: {log_file}")
-        print(f"✅ Total transactions in log: {len(combined_df)}")
+        print(f"✅ Updated log: {log_dir}/")
+        print(f"✅ Total transactions in log: {monthly_summary['Transaction Count'].sum()}")
+        unknown_df = read_unknown_rows(log_dir)
+        if unknown_df is not None:
+            print(f"⚠️  Plus {len(unknown_df)} rows with an unknown year/month in {log_dir}/{UNKNOWN_LOG_FILE}")
+        
+        # Excel copy is only an export for humans; the Parquet log is the source of truth
+        if export_excel:
+            export_log_to_excel(log_dir, excel_file)
+            print(f"✅ Exported log to {excel_file}")
+        elif os.path.exists(excel_file):
+            print(f"ℹ️  {excel_file} is not updated automatically; run with --export-excel to refresh it")
         
         # Show summary by month
-        if "Year" in combined_df.columns and "Month" in combined_df.columns:
-            monthly_summary = combined_df.groupby(["Year", "Month"]).agg({
-                "Amount": ["count", "sum"]
-            }).round(2)
-            monthly_summary.columns = ["Transaction Count", "Total Amount"]
-            print("\n📊 Monthly Summary:")
-            print(monthly_summary)
+        monthly_summary = monthly_summary.set_index(["Year", "Month"])
+        monthly_summary["Total Amount"] = cents_to_dollars(monthly_summary["Total Amount"])
+        print("\n📊 Monthly Summary:")
+        print(monthly_summary)
         
         # Show category breakdown for latest month
         if "Category" in df.columns:
             print(f"\n🏷️  Category breakdown for {month} {year}:")
-            category_summary = df.groupby("Category").agg({
+            category_summary = df.groupby("Category", observed=True).agg({
                 "Amount": ["count", "sum"]
-            }).round(2)
+            })
             category_summary.columns = ["Count", "Total Amount"]
+            category_summary["Total Amount"] = cents_to_dollars(category_summary["Total Amount"])
             print(category_summary)
         
         print(f"\n📝 Latest transactions from {month} {year}:")
-        print(df.head())
+        latest_df = df.head()
+        print(latest_df.assign(Amount=cents_to_dollars(latest_df["Amount"])))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(export_excel="--export-excel" in sys.argv[1:])
\ No newline at end of file
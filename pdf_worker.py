@@ -0,0 +1,9 @@
+import fitz  # PyMuPDF
+
+# Kept out of app.py so unpickling the worker function only needs PyMuPDF
+
+def extract_page_range_text(args):
+    """Worker: extract the text of pages [start, stop) from a PDF"""
+    pdf_path, start, stop = args
+    with fitz.open(pdf_path) as doc:
+        return "".join(doc[i].get_text() for i in range(start, stop))